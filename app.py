@@ -4,25 +4,66 @@ by removing vocals using Demucs (htdemucs) and FFmpeg.
 
 Author: Eduarth Schmidt
 Run: python app.py
+Startup benchmark: python app.py --benchmark [VIDEO] (see benchmark_startup.py)
 """
 
 __author__ = "Eduarth Schmidt"
 
+import argparse
+import json
 import sys
+import time
 from pathlib import Path
 
 # Ensure project root is on path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import QTimer
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import QApplication
 
+from core.warmup import start_warmup
 from ui.main_window import MainWindow
 
 
+def _benchmark_event(event: str, **extra):
+    """Print a timestamped event as a JSON line for benchmark_startup.py."""
+    print(json.dumps({"event": event, "t": time.time(), **extra}), flush=True)
+
+
+def _run_benchmark(app: QApplication, w: MainWindow, video: str, idle: float):
+    _benchmark_event("window_shown")
+    # Started only now so the warm-up thread does not count towards time-to-window
+    start_warmup()
+    if not video:
+        app.quit()
+        return
+
+    def on_job_finished(ok: bool):
+        _benchmark_event("first_result", ok=ok)
+        app.quit()
+
+    def submit():
+        _benchmark_event("job_submitted")
+        w.on_video_selected(video)
+
+    w.job_finished.connect(on_job_finished)
+    QTimer.singleShot(int(idle * 1000), submit)
+
+
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="AudioStem-Pro desktop app")
+    parser.add_argument(
+        "--benchmark", nargs="?", const="", default=None, metavar="VIDEO",
+        help="Print startup timings as JSON lines; process VIDEO if given, then quit",
+    )
+    parser.add_argument(
+        "--benchmark-idle", type=float, default=0.0, metavar="SECONDS",
+        help="With --benchmark: wait this long before submitting VIDEO",
+    )
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication([sys.argv[0], *qt_args])
     app.setApplicationName("AudioStem-Pro")
     app.setApplicationDisplayName("AudioStem-Pro")
     font = QFont()
@@ -30,6 +71,11 @@ def main():
     app.setFont(font)
     w = MainWindow()
     w.show()
+    if args.benchmark is not None:
+        QTimer.singleShot(0, lambda: _run_benchmark(app, w, args.benchmark, args.benchmark_idle))
+    else:
+        # Import torch/demucs and load the default model once the event loop is running
+        QTimer.singleShot(0, start_warmup)
     sys.exit(app.exec())
 
 
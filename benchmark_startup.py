@@ -0,0 +1,147 @@
+"""
+AudioStem-Pro — Startup benchmark.
+
+Measures time-to-window (desktop) or time-to-ready (web) from process launch,
+and, when a sample video is given, time-to-first-result from job submission.
+
+Usage:
+    python benchmark_startup.py desktop [VIDEO] [--idle SECONDS] [--no-warmup]
+    python benchmark_startup.py web [VIDEO] [--idle SECONDS] [--no-warmup] [--port PORT]
+
+--idle waits before submitting the job, like a user picking a file; compare
+runs with and without --no-warmup to see what the background warm-up saves.
+Each run uses a fresh AUDIOSTEM_HOME with the segment cache off, so runs do not
+reuse each other's separated segments or feed the real timings.json.
+Desktop runs need a display (or QT_QPA_PLATFORM=offscreen).
+
+Author: Eduarth Schmidt
+"""
+
+__author__ = "Eduarth Schmidt"
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+
+def benchmark_desktop(video: str | None, idle: float, env: dict) -> dict:
+    cmd = [sys.executable, str(ROOT / "app.py"), "--benchmark", video or "", "--benchmark-idle", str(idle)]
+    launched = time.time()
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    events = {}
+    for line in proc.stdout.splitlines():
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(data, dict) and "event" in data:
+            events[data["event"]] = data
+    if "window_shown" not in events:
+        raise RuntimeError(f"Desktop app did not report startup:\n{proc.stderr}")
+    result = {"time_to_window": events["window_shown"]["t"] - launched}
+    if "first_result" in events:
+        result["time_to_first_result"] = events["first_result"]["t"] - events["job_submitted"]["t"]
+        result["ok"] = events["first_result"]["ok"]
+    return result
+
+
+def _post_video(url: str, video: Path) -> dict:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in (("model_name", "htdemucs"), ("shifts", "1"), ("segment_cache", "0")):
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{video.name}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n".encode()
+        + video.read_bytes()
+        + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    req = urllib.request.Request(
+        url,
+        data=b"".join(parts),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    with urllib.request.urlopen(req) as r:
+        return json.loads(r.read())
+
+
+def _get_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=5) as r:
+        return json.loads(r.read())
+
+
+def benchmark_web(video: str | None, idle: float, env: dict, port: int) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    env = dict(env, PORT=str(port), AUDIOSTEM_NO_BROWSER="1")
+    launched = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "web_app.py")],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("Web app exited during startup")
+            try:
+                _get_json(base + "/health")
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.05)
+        result = {"time_to_ready": time.time() - launched}
+        if video:
+            time.sleep(idle)
+            submitted = time.time()
+            job_id = _post_video(base + "/upload", Path(video))["job_id"]
+            while True:
+                status = _get_json(f"{base}/progress/{job_id}")
+                if status["status"] in ("done", "error"):
+                    break
+                time.sleep(0.2)
+            result["time_to_first_result"] = time.time() - submitted
+            result["ok"] = status["status"] == "done"
+            result["warmup_status"] = _get_json(base + "/health")["warmup"]
+        return result
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AudioStem-Pro startup benchmark")
+    parser.add_argument("target", choices=["desktop", "web"])
+    parser.add_argument("video", nargs="?", help="Sample video for time-to-first-result")
+    parser.add_argument("--idle", type=float, default=0.0, help="Seconds to wait before submitting")
+    parser.add_argument("--no-warmup", action="store_true", help="Disable the background warm-up")
+    parser.add_argument("--port", type=int, default=5099, help="Port for the web app (web only)")
+    args = parser.parse_args()
+
+    video = str(Path(args.video).resolve()) if args.video else None
+    with tempfile.TemporaryDirectory(prefix="audiostem-benchmark-") as home:
+        env = dict(os.environ, AUDIOSTEM_HOME=home, AUDIOSTEM_SEGMENT_CACHE="0")
+        if args.no_warmup:
+            env["AUDIOSTEM_NO_WARMUP"] = "1"
+        if args.target == "desktop":
+            result = benchmark_desktop(video, args.idle, env)
+        else:
+            result = benchmark_web(video, args.idle, env, args.port)
+    result.update(target=args.target, idle=args.idle, warmup=not args.no_warmup)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ Stem combining is done in the worker using Demucs tensors and save_audio.
 
 import shutil
 import subprocess
+import wave
 from pathlib import Path
 
 
@@ -33,7 +34,12 @@ def check_ffmpeg_available() -> tuple[bool, str]:
     return True, ""
 
 
-def extract_audio_to_wav(video_path: str | Path, wav_path: str | Path) -> None:
+def extract_audio_to_wav(
+    video_path: str | Path,
+    wav_path: str | Path,
+    start: float | None = None,
+    duration: float | None = None,
+) -> None:
     """
     Extract audio from a video file into a temporary WAV (mono, 44100 Hz)
     for Demucs. Overwrites wav_path if it exists.
@@ -41,6 +47,8 @@ def extract_audio_to_wav(video_path: str | Path, wav_path: str | Path) -> None:
     Args:
         video_path: Path to .mp4, .mov, or other video file.
         wav_path: Path for the output .wav file.
+        start: Optional offset in seconds; FFmpeg seeks there before decoding.
+        duration: Optional length in seconds of the excerpt to extract.
 
     Raises:
         FileNotFoundError: If video_path does not exist.
@@ -54,10 +62,14 @@ def extract_audio_to_wav(video_path: str | Path, wav_path: str | Path) -> None:
     wav_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Demucs htdemucs expects 44100 Hz; use 1 channel to save memory and match typical use
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-i", str(video_path),
+    cmd = ["ffmpeg", "-y"]
+    if start:
+        # -ss before -i seeks in the container instead of decoding up to start
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", str(video_path)]
+    if duration:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += [
         "-vn",
         "-acodec", "pcm_s16le",
         "-ar", "44100",
@@ -71,3 +83,131 @@ def extract_audio_to_wav(video_path: str | Path, wav_path: str | Path) -> None:
         raise RuntimeError(f"FFmpeg failed to extract audio: {stderr}")
     if not wav_path.exists() or wav_path.stat().st_size == 0:
         raise RuntimeError("FFmpeg produced no output file or empty file.")
+
+
+# Audio up to this length is scanned completely when picking a preview excerpt;
+# longer audio is sampled with LOUDNESS_PROBES short seeks so the cost stays flat.
+LOUDNESS_FULL_SCAN_SECONDS = 300.0
+LOUDNESS_PROBES = 12
+LOUDNESS_PROBE_SECONDS = 2.0
+_LOUDNESS_RATE = 4000
+
+
+def _decode_low_rate(media_path: Path, start: float | None = None, duration: float | None = None):
+    """Decode mono audio at _LOUDNESS_RATE as a numpy float array, or None on failure."""
+    import numpy as np
+
+    cmd = ["ffmpeg"]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", str(media_path)]
+    if duration:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-vn", "-ac", "1", "-ar", str(_LOUDNESS_RATE), "-f", "s16le", "-loglevel", "error", "-"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=120)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32)
+
+
+def find_loudest_window(
+    media_path: str | Path,
+    window_seconds: float,
+    duration: float | None = None,
+) -> float:
+    """
+    Find the start (in seconds) of the loudest window_seconds of audio.
+
+    Audio up to LOUDNESS_FULL_SCAN_SECONDS (or of unknown duration, then only
+    its beginning) is decoded at a low rate and every second compared. Longer
+    audio is sampled at LOUDNESS_PROBES evenly spaced points using FFmpeg
+    seeking, and the window is centred on the loudest sample. Returns 0.0 if
+    the audio is shorter than the window or cannot be decoded.
+    """
+    import numpy as np
+
+    media_path = Path(media_path).resolve()
+    window = int(window_seconds)
+    if window <= 0 or (duration is not None and duration <= window):
+        return 0.0
+
+    if duration is None or duration <= LOUDNESS_FULL_SCAN_SECONDS:
+        samples = _decode_low_rate(media_path, duration=LOUDNESS_FULL_SCAN_SECONDS)
+        if samples is None:
+            return 0.0
+        seconds = len(samples) // _LOUDNESS_RATE
+        if seconds <= window:
+            return 0.0
+        energy = np.square(samples[: seconds * _LOUDNESS_RATE])
+        energy = energy.reshape(seconds, _LOUDNESS_RATE).sum(axis=1)
+        totals = np.convolve(energy, np.ones(window), mode="valid")
+        return float(np.argmax(totals))
+
+    best_start, best_energy = 0.0, -1.0
+    span = duration - LOUDNESS_PROBE_SECONDS
+    for i in range(LOUDNESS_PROBES):
+        at = span * (i + 0.5) / LOUDNESS_PROBES
+        samples = _decode_low_rate(media_path, start=at, duration=LOUDNESS_PROBE_SECONDS)
+        if samples is None or not len(samples):
+            continue
+        energy = float(np.mean(np.square(samples)))
+        if energy > best_energy:
+            best_energy = energy
+            best_start = at + LOUDNESS_PROBE_SECONDS / 2 - window_seconds / 2
+    return float(min(max(0.0, best_start), duration - window_seconds))
+
+
+def is_pcm_wav(path: str | Path) -> bool:
+    """
+    Check that a file is a non-empty 16-bit PCM WAV (as sent by the web UI
+    after decoding the audio track in the browser).
+    """
+    try:
+        with wave.open(str(path), "rb") as w:
+            return w.getsampwidth() == 2 and w.getnframes() > 0 and w.getnchannels() in (1, 2)
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def probe_duration(media_path: str | Path) -> float | None:
+    """
+    Return the duration of a media file in seconds.
+
+    WAV files are read directly; anything else is probed with ffprobe.
+
+    Returns:
+        Duration in seconds, or None if it cannot be determined.
+    """
+    media_path = Path(media_path).resolve()
+    if not media_path.exists():
+        return None
+    if media_path.suffix.lower() == ".wav":
+        try:
+            with wave.open(str(media_path), "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        except (wave.Error, EOFError, OSError):
+            pass
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe:
+        return None
+    cmd = [
+        ffprobe,
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        str(media_path),
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        duration = float(result.stdout.strip())
+    except ValueError:
+        return None
+    return duration if duration > 0 else None
@@ -0,0 +1,262 @@
+"""
+Completion-time estimates and the "auto" quality profile.
+
+Every finished separation records its real-time factor (separation seconds per
+second of audio) for the model, shift count and device it ran on. Estimates
+use those measurements; until this machine has run a given model, its rough
+default is scaled by how the measured models compared to their defaults.
+"""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from .paths import APP_DATA_DIR
+
+TIMINGS_PATH = APP_DATA_DIR / "timings.json"
+
+# Rough CPU real-time factors for a single shift, used until a run is measured.
+_DEFAULT_RTF = {
+    "htdemucs": 0.6,
+    "mdx_extra_q": 1.6,
+    "htdemucs_6s": 0.9,
+}
+_CUDA_SPEEDUP = 8.0
+# Extraction, model load and mixing; not part of the measured separation time.
+_OVERHEAD_SECONDS = 10.0
+# Weight of the newest measurement in the running average.
+_EMA_ALPHA = 0.3
+
+# Candidates for the "auto" profile as (model_name, shifts), best quality first.
+AUTO_CANDIDATES = [
+    ("mdx_extra_q", 10),
+    ("htdemucs", 10),
+    ("mdx_extra_q", 5),
+    ("htdemucs", 5),
+    ("mdx_extra_q", 2),
+    ("htdemucs", 2),
+    ("htdemucs", 1),
+]
+
+_lock = threading.Lock()
+_timings: dict | None = None
+
+# Separations running in this process and that count integrated over time, so a
+# run can tell how many others it overlapped with on average.
+_running = 0
+_running_integral = 0.0
+_running_since = time.monotonic()
+
+
+def _load() -> dict:
+    global _timings
+    if _timings is None:
+        try:
+            data = json.loads(TIMINGS_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict) or not isinstance(data.get("rtf"), dict):
+            data = {"rtf": {}}
+        _timings = data
+    return _timings
+
+
+def _save(data: dict) -> None:
+    try:
+        TIMINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = TIMINGS_PATH.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(TIMINGS_PATH)
+    except OSError:
+        pass
+
+
+def _key(model_name: str, shifts: int, device: str) -> str:
+    return f"{device}:{model_name}:{shifts}"
+
+
+def default_device() -> str:
+    """
+    Device estimates assume when none is given ("cuda" or "cpu"), without
+    importing torch: the last one detected by set_device, "cpu" until then.
+    """
+    with _lock:
+        return _load().get("device", "cpu")
+
+
+def set_device(device: str) -> None:
+    """Remember the device torch detected (warm-up, each run) for later estimates."""
+    with _lock:
+        data = _load()
+        if data.get("device") != device:
+            data["device"] = device
+            _save(data)
+
+
+def _advance_running() -> None:
+    """Bring _running_integral up to now (under _lock)."""
+    global _running_integral, _running_since
+    now = time.monotonic()
+    _running_integral += _running * (now - _running_since)
+    _running_since = now
+
+
+@contextmanager
+def track_run():
+    """
+    Count the enclosed block as a running separation.
+
+    Yields a function returning the average number of other separations that
+    ran alongside it so far, for record_run's queue_load.
+    """
+    global _running
+    with _lock:
+        _advance_running()
+        _running += 1
+        started, integral = _running_since, _running_integral
+
+    def other_runs() -> float:
+        with _lock:
+            _advance_running()
+            elapsed = _running_since - started
+            if elapsed <= 0:
+                return 0.0
+            return max(0.0, (_running_integral - integral) / elapsed - 1)
+
+    try:
+        yield other_runs
+    finally:
+        with _lock:
+            _advance_running()
+            _running -= 1
+
+
+def record_run(
+    model_name: str,
+    shifts: int,
+    device: str,
+    audio_seconds: float,
+    elapsed_seconds: float,
+    queue_load: float = 0,
+) -> None:
+    """
+    Fold a finished separation into the stored real-time factors.
+
+    queue_load is the average number of other jobs that shared the hardware
+    while it ran (see track_run); the measurement is normalized to an unloaded
+    run, since estimate_seconds applies the current load itself.
+    """
+    if audio_seconds <= 0 or elapsed_seconds <= 0:
+        return
+    rtf = elapsed_seconds / audio_seconds / (1 + max(0, queue_load))
+    with _lock:
+        data = _load()
+        key = _key(model_name, shifts, device)
+        previous = data["rtf"].get(key)
+        if previous is not None:
+            rtf = (1 - _EMA_ALPHA) * previous + _EMA_ALPHA * rtf
+        data["rtf"][key] = rtf
+        data["device"] = device
+        _save(data)
+
+
+def _default_rtf(model_name: str, shifts: int, device: str) -> float:
+    rtf = _DEFAULT_RTF.get(model_name, max(_DEFAULT_RTF.values())) * shifts
+    if device == "cuda":
+        rtf /= _CUDA_SPEEDUP
+    return rtf
+
+
+def real_time_factor(model_name: str, shifts: int, device: str) -> float:
+    """
+    Separation seconds per second of audio for a model/shift/device combination.
+
+    Uses the measurement for that exact combination if there is one, otherwise
+    scales a measurement of the same model at another shift count (each shift
+    is a full pass). For a model not yet measured on this device, the built-in
+    default is scaled by how much faster or slower the measured models ran
+    than their defaults; with no measurements at all the default is used.
+    """
+    with _lock:
+        measured = dict(_load()["rtf"])
+    exact = measured.get(_key(model_name, shifts, device))
+    if exact is not None:
+        return exact
+    same_model, ratios = [], []
+    for key, rtf in measured.items():
+        parts = key.split(":")
+        if len(parts) != 3 or parts[0] != device or not parts[2].isdigit() or int(parts[2]) <= 0:
+            continue
+        if not isinstance(rtf, (int, float)) or rtf <= 0:
+            continue
+        if parts[1] == model_name:
+            same_model.append(rtf / int(parts[2]))
+        ratios.append(rtf / _default_rtf(parts[1], int(parts[2]), device))
+    if same_model:
+        return sum(same_model) / len(same_model) * shifts
+    rtf = _default_rtf(model_name, shifts, device)
+    if ratios:
+        # Geometric mean, so one unusually slow or fast run does not dominate
+        rtf *= math.exp(sum(math.log(r) for r in ratios) / len(ratios))
+    return rtf
+
+
+def estimate_seconds(
+    model_name: str,
+    shifts: int,
+    audio_seconds: float,
+    device: str | None = None,
+    queue_load: int = 0,
+) -> float:
+    """
+    Estimated wall-clock time for a full job.
+
+    Args:
+        model_name: Demucs model bag name.
+        shifts: Number of shifts.
+        audio_seconds: Duration of the input audio.
+        device: "cuda" or "cpu"; default: default_device().
+        queue_load: Number of other jobs sharing the hardware at the same time.
+    """
+    device = device or default_device()
+    separation = real_time_factor(model_name, shifts, device) * audio_seconds
+    return _OVERHEAD_SECONDS + separation * (1 + max(0, queue_load))
+
+
+def choose_profile(
+    audio_seconds: float,
+    device: str | None = None,
+    deadline_seconds: float | None = None,
+    queue_load: int = 0,
+) -> tuple[str, int, float]:
+    """
+    Pick the best (model, shifts) from AUTO_CANDIDATES that finishes in time.
+
+    Without a deadline the job should finish within the audio's own duration
+    (at least one minute). If nothing fits, the fastest candidate is used.
+
+    Returns:
+        (model_name, shifts, estimated_seconds)
+    """
+    if deadline_seconds is None or deadline_seconds <= 0:
+        deadline_seconds = max(60.0, audio_seconds)
+    for model_name, shifts in AUTO_CANDIDATES:
+        est = estimate_seconds(model_name, shifts, audio_seconds, device, queue_load)
+        if est <= deadline_seconds:
+            return model_name, shifts, est
+    model_name, shifts = AUTO_CANDIDATES[-1]
+    return model_name, shifts, estimate_seconds(model_name, shifts, audio_seconds, device, queue_load)
+
+
+def format_duration(seconds: float) -> str:
+    """Human-readable duration, e.g. "45s", "3m 20s", "1h 05m"."""
+    seconds = int(round(max(0.0, seconds)))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
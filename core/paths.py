@@ -0,0 +1,14 @@
+"""
+Per-user data locations for AudioStem-Pro (measured timings, caches).
+Override the base folder with the AUDIOSTEM_HOME environment variable.
+
+AUDIOSTEM_MODEL_DIR points at a local Demucs model repository (.th weights
+and .yaml bag files); models are then loaded from there without downloading.
+"""
+
+import os
+from pathlib import Path
+
+APP_DATA_DIR = Path(os.environ.get("AUDIOSTEM_HOME") or Path.home() / ".audiostem-pro")
+
+MODEL_DIR = Path(os.environ["AUDIOSTEM_MODEL_DIR"]) if os.environ.get("AUDIOSTEM_MODEL_DIR") else None
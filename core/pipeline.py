@@ -5,10 +5,22 @@ Progress is reported via an optional callback(status: str, progress: int 0-100).
 """
 
 import tempfile
+import threading
+import time
 from pathlib import Path
 from typing import Callable
 
-from .audio_utils import extract_audio_to_wav
+from .audio_utils import extract_audio_to_wav, find_loudest_window, probe_duration
+from .estimator import (
+    choose_profile,
+    estimate_seconds,
+    real_time_factor,
+    record_run,
+    set_device,
+    track_run,
+)
+from .paths import MODEL_DIR
+from .segment_cache import ENABLED as SEGMENT_CACHE_ENABLED, separate_with_cache
 
 # Demucs model options (bag names from demucs remote repo)
 DEMUCS_MODELS = [
@@ -17,14 +29,77 @@ DEMUCS_MODELS = [
     ("htdemucs_6s", "HTDemucs 6-stem (drums, bass, other, vocals, piano, guitar)"),
 ]
 
+# Picks model and shifts from measured timings so the job fits a deadline.
+AUTO_PROFILE = "auto"
+
 # Quality = number of shifts (equivariant stabilization). More = better quality, slower.
 QUALITY_PROFILES = [
     (1, "Fast (1 shift)"),
     (2, "Balanced (2 shifts)"),
     (5, "High (5 shifts)"),
     (10, "Best (10 shifts)"),
+    (AUTO_PROFILE, "Auto (best that fits the deadline)"),
 ]
 
+# Preview jobs separate a short excerpt with the fast profile.
+PREVIEW_SECONDS = 30.0
+PREVIEW_SHIFTS = 1
+
+# Loaded models are kept so later jobs (e.g. a promoted preview) skip loading.
+_MODEL_CACHE_SIZE = 2
+_models: dict[tuple[str, str], object] = {}
+# Guards _models and _model_locks only; loads hold the per-(model, device) lock
+_models_lock = threading.Lock()
+_model_locks: dict[tuple[str, str], threading.Lock] = {}
+
+
+def load_model(model_name: str, device: str):
+    """
+    Return the Demucs model for model_name on device, loading it on first use
+    (from MODEL_DIR if set, otherwise downloaded/cached by Demucs).
+
+    The most recently used models stay in memory; concurrent callers of the
+    same model and device wait for a load in progress instead of loading it
+    twice, while other models load in parallel.
+    """
+    key = (model_name, device)
+    with _models_lock:
+        model = _models.pop(key, None)
+        if model is not None:
+            _models[key] = model
+            return model
+        key_lock = _model_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _models_lock:
+            model = _models.get(key)
+        if model is None:
+            from demucs.pretrained import get_model
+
+            if MODEL_DIR is not None:
+                if not MODEL_DIR.is_dir():
+                    raise RuntimeError(f"Model directory not found: {MODEL_DIR}")
+                model = get_model(model_name, repo=MODEL_DIR)
+            else:
+                model = get_model(model_name)
+            model.to(device)
+            model.eval()
+
+    evicted = []
+    with _models_lock:
+        _models.pop(key, None)
+        _models[key] = model
+        while len(_models) > _MODEL_CACHE_SIZE:
+            evicted_key = next(iter(_models))
+            _models.pop(evicted_key)
+            evicted.append(evicted_key)
+    if any(evicted_device == "cuda" for _, evicted_device in evicted):
+        import torch
+
+        # Return the evicted model's memory to the GPU for the next load
+        torch.cuda.empty_cache()
+    return model
+
 
 def run_pipeline(
     video_path: str | Path,
@@ -32,7 +107,16 @@ def run_pipeline(
     progress_callback: Callable[[str, int], None] | None = None,
     *,
     model_name: str = "htdemucs",
-    shifts: int = 1,
+    shifts: int | str = 1,
+    deadline: float | None = None,
+    queue_load: int = 0,
+    info_callback: Callable[[dict], None] | None = None,
+    skip_extraction: bool = False,
+    preview: bool = False,
+    preview_start: float | None = None,
+    audio_duration: float | None = None,
+    segment_cache: bool = True,
+    output_stem: str | None = None,
 ) -> Path:
     """
     Extract background music (no vocals) from a video file.
@@ -42,10 +126,29 @@ def run_pipeline(
         output_dir: Directory for output WAV. Default: same folder as video, subdir AudioStem-Pro_output.
         progress_callback: Optional callback(status_message, progress_percent).
         model_name: Demucs model bag name (htdemucs, mdx_extra_q, htdemucs_6s).
-        shifts: Number of random shifts for quality (1=fast, 10=best, slower).
+        shifts: Number of random shifts for quality (1=fast, 10=best, slower),
+            or AUTO_PROFILE to pick model and shifts that fit the deadline.
+        deadline: Seconds the job should take at most (AUTO_PROFILE only).
+            Default: the duration of the audio, at least one minute.
+        queue_load: Number of other jobs running at the same time, for the
+            estimate; the recorded timing uses the measured overlap instead.
+        info_callback: Optional callback(info) receiving a dict with the chosen
+            model_name, shifts, audio duration and estimate_seconds.
+        skip_extraction: video_path is already a WAV (e.g. decoded in the
+            browser); separate it directly instead of extracting with FFmpeg.
+        preview: Separate only a PREVIEW_SECONDS excerpt with the fast profile.
+        preview_start: Excerpt offset in seconds. Default: the loudest section.
+        audio_duration: Duration of the input if already known (e.g. from a
+            preview of the same file); skips probing.
+        segment_cache: Reuse separated segments shared with earlier videos
+            (see core.segment_cache; always off with AUDIOSTEM_SEGMENT_CACHE=0).
+            info_callback then also receives
+            cache_segments, cache_hits, cache_hit_ratio and cache_time_saved.
+        output_stem: Base name for the output file. Default: video_path.stem.
 
     Returns:
-        Path to the output WAV file: {video_stem}_background_music.wav
+        Path to the output WAV file: {video_stem}_background_music.wav,
+        or {video_stem}_preview.wav for previews.
 
     Raises:
         FileNotFoundError, RuntimeError: On extraction or separation failure.
@@ -60,44 +163,142 @@ def run_pipeline(
         if progress_callback:
             progress_callback(status, progress)
 
+    auto = shifts == AUTO_PROFILE
+    if preview:
+        if auto:
+            model_name = "htdemucs"
+        shifts = PREVIEW_SHIFTS
+        auto = False
+
+    def plan(duration: float | None):
+        nonlocal model_name, shifts
+        if duration is None:
+            if auto:
+                model_name, shifts = "htdemucs", 1
+            return
+        if auto:
+            model_name, shifts, estimate = choose_profile(
+                duration, deadline_seconds=deadline, queue_load=queue_load
+            )
+        else:
+            estimate = estimate_seconds(model_name, shifts, duration, queue_load=queue_load)
+        if info_callback:
+            info = {
+                "model_name": model_name,
+                "shifts": shifts,
+                "duration": duration,
+                "estimate_seconds": estimate,
+            }
+            if preview:
+                info["preview_start"] = start
+                info["source_duration"] = source_duration
+            info_callback(info)
+
     report("Extracting audio from video…", 0)
+    if skip_extraction and not video_path.exists():
+        raise FileNotFoundError(f"Audio file not found: {video_path}")
+    source_duration = audio_duration or probe_duration(video_path)
+    duration = source_duration
+    start = None
+    if preview:
+        if preview_start is None:
+            report("Finding the loudest section…", 5)
+            start = find_loudest_window(video_path, PREVIEW_SECONDS, source_duration)
+        else:
+            start = max(0.0, float(preview_start))
+        if source_duration:
+            start = min(start, max(0.0, source_duration - PREVIEW_SECONDS))
+            duration = min(PREVIEW_SECONDS, source_duration - start)
+        else:
+            duration = None
+    if duration is not None:
+        plan(duration)
 
     with tempfile.TemporaryDirectory(prefix="audiostem_") as tmpdir:
         tmp = Path(tmpdir)
-        wav_path = tmp / "extracted.wav"
-        extract_audio_to_wav(video_path, wav_path)
+        if preview:
+            wav_path = tmp / "excerpt.wav"
+            extract_audio_to_wav(video_path, wav_path, start=start, duration=PREVIEW_SECONDS)
+        elif skip_extraction:
+            wav_path = video_path
+        else:
+            wav_path = tmp / "extracted.wav"
+            extract_audio_to_wav(video_path, wav_path)
+        if duration is None:
+            duration = probe_duration(wav_path)
+            plan(duration)
         report("Extracting audio from video…", 25)
 
         report("Running AI separation (Demucs)…", 35)
         import torch
-        from demucs.pretrained import get_model
         from demucs.separate import load_track
         from demucs.apply import apply_model
         from demucs.audio import save_audio
 
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        model = get_model(model_name)
-        model.to(device)
-        model.eval()
+        set_device(device)
+        model = load_model(model_name, device)
         wav = load_track(wav_path, model.audio_channels, model.samplerate)
+        if not duration:
+            duration = wav.shape[-1] / model.samplerate
+        mixture = wav
         ref = wav.mean(0)
         wav = wav - ref.mean()
         wav = wav / (ref.std() + 1e-8)
-        sources = apply_model(
-            model, wav[None], device=device, shifts=shifts, split=True, overlap=0.25,
-            progress=False,
-        )[0]
-        sources = sources * ref.std() + ref.mean()
+
+        def separate(start: int = 0, end: int | None = None):
+            sources = apply_model(
+                model, wav[None, :, start:end], device=device, shifts=shifts, split=True,
+                overlap=0.25, progress=False,
+            )[0]
+            sources = sources * ref.std() + ref.mean()
+            # Sum all stems except vocals (works for 4-stem and 6-stem models)
+            if "vocals" in model.sources:
+                vocals_idx = model.sources.index("vocals")
+                return sum(sources[i] for i in range(len(sources)) if i != vocals_idx)
+            return sources.sum(dim=0)
+
+        # Other jobs separating at the same time slow this one down; measure
+        # how many overlapped on average instead of trusting the count at submission
+        with track_run() as other_runs:
+            # Preview excerpts start off the segment grid, so they would only fill the cache
+            if segment_cache and SEGMENT_CACHE_ENABLED and not preview:
+                background, stats = separate_with_cache(
+                    mixture.numpy(),
+                    model.samplerate,
+                    model_name,
+                    shifts,
+                    lambda start, end: separate(start, end).cpu().numpy(),
+                )
+                background = torch.from_numpy(background)
+                # Only time spent in the model counts, not fingerprinting or cache I/O
+                separated_seconds = stats["computed_seconds"]
+                elapsed = stats["separation_seconds"]
+                time_saved = stats["hit_seconds"] * real_time_factor(model_name, shifts, device)
+                if info_callback:
+                    info_callback({
+                        "cache_segments": stats["segments"],
+                        "cache_hits": stats["hits"],
+                        "cache_hit_ratio": stats["hit_ratio"],
+                        "cache_time_saved": time_saved,
+                    })
+            else:
+                started = time.perf_counter()
+                background = separate()
+                elapsed = time.perf_counter() - started
+                separated_seconds = duration
+            overlap = other_runs()
+        # Previews are too short to be representative of full-length runs
+        if separated_seconds and not preview:
+            record_run(
+                model_name, shifts, device, separated_seconds, elapsed,
+                queue_load=overlap,
+            )
         report("Running AI separation (Demucs)…", 85)
 
         report("Combining background stems…", 90)
-        # Sum all stems except vocals (works for 4-stem and 6-stem models)
-        if "vocals" in model.sources:
-            vocals_idx = model.sources.index("vocals")
-            background = sum(sources[i] for i in range(len(sources)) if i != vocals_idx)
-        else:
-            background = sources.sum(dim=0)
-        out_name = video_path.stem + "_background_music.wav"
+        suffix = "_preview.wav" if preview else "_background_music.wav"
+        out_name = (output_stem or video_path.stem) + suffix
         out_path = output_dir / out_name
         save_audio(
             background,
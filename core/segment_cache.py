@@ -0,0 +1,349 @@
+"""
+Segment-level cache of separated background audio, shared across videos.
+
+The extracted track is cut into SEGMENT_SECONDS segments on a grid starting at
+0 s. Each frame of a segment gets a 32-bit sub-fingerprint (signs of
+band-energy differences between neighbouring frames and bands, after Haitsma &
+Kalker). A segment matches a stored one when the bit error rate between their
+frame-aligned sub-fingerprints is below MATCH_BER. That tolerates
+re-encoding, added noise and gain changes (cached audio is rescaled by RMS),
+so the same intro music or stinger in different videos is separated once.
+Matches must line up with the grid, i.e. the shared audio must start at the
+same offset from a segment boundary in both videos. Only unmatched spans are
+separated. Entries keep CROSSFADE_SECONDS of separated audio beyond each end,
+so every join (fresh or cached on either side) is crossfaded.
+
+Entries are 16-bit .npz files under APP_DATA_DIR/segments; the least recently
+used are evicted once the store exceeds AUDIOSTEM_SEGMENT_CACHE_MB (default
+2048). Set AUDIOSTEM_SEGMENT_CACHE=0 to turn the cache off.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from .paths import APP_DATA_DIR
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+CACHE_DIR = APP_DATA_DIR / "segments"
+ENABLED = os.environ.get("AUDIOSTEM_SEGMENT_CACHE", "1") != "0"
+MAX_CACHE_BYTES = _env_int("AUDIOSTEM_SEGMENT_CACHE_MB", 2048) * 1024 * 1024
+
+SEGMENT_SECONDS = 10.0
+CROSSFADE_SECONDS = 0.1
+# Highest fraction of differing fingerprint bits still treated as the same audio
+# (the threshold from Haitsma & Kalker; unrelated audio sits around 0.5)
+MATCH_BER = 0.35
+
+_FRAME = 4096
+_HOP = 2048
+_BAND_EDGES_HZ = (300.0, 2000.0)
+_BANDS = 33
+
+_lock = threading.Lock()
+# entry id -> (meta, sub-fingerprints); None until loaded from CACHE_DIR
+_entries: dict[str, tuple[str, object]] | None = None
+# (meta, frame count) -> (entry ids, stacked sub-fingerprints), rebuilt when entries change
+_matrices: dict[tuple[str, int], tuple[list[str], object]] = {}
+_popcount16 = None
+
+
+def sub_fingerprints(mono, samplerate: int):
+    """One 32-bit sub-fingerprint per frame (numpy uint32 array) of a mono segment."""
+    import numpy as np
+
+    n_frames = 1 + (len(mono) - _FRAME) // _HOP
+    if n_frames < 2:
+        return np.zeros(0, dtype=np.uint32)
+    idx = np.arange(_FRAME)[None, :] + _HOP * np.arange(n_frames)[:, None]
+    frames = mono[idx] * np.hanning(_FRAME)
+    spec = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(_FRAME, 1.0 / samplerate)
+    edges = np.geomspace(_BAND_EDGES_HZ[0], _BAND_EDGES_HZ[1], _BANDS + 1)
+    energies = np.stack(
+        [spec[:, (freqs >= lo) & (freqs < hi)].sum(axis=1) for lo, hi in zip(edges[:-1], edges[1:])],
+        axis=1,
+    )
+    diff = energies[:, :-1] - energies[:, 1:]
+    bits = (diff[1:] - diff[:-1]) > 0
+    weights = (1 << np.arange(31, -1, -1, dtype=np.uint64)).astype(np.uint64)
+    return (bits.astype(np.uint64) * weights).sum(axis=1).astype(np.uint32)
+
+
+def _popcount(words):
+    """Number of set bits in each element of a uint32 array."""
+    import numpy as np
+
+    global _popcount16
+    if _popcount16 is None:
+        _popcount16 = np.unpackbits(np.arange(1 << 16, dtype=np.uint16).view(np.uint8)).reshape(-1, 16)
+        _popcount16 = _popcount16.sum(axis=1).astype(np.uint8)
+    return _popcount16[words & 0xFFFF].astype(np.uint32) + _popcount16[words >> 16]
+
+
+def bit_error_rates(fps, fp):
+    """Fraction of differing bits between fp and each row of fps (same frame count)."""
+    import numpy as np
+
+    return _popcount(np.bitwise_xor(fps, fp[None, :])).sum(axis=1) / (fp.shape[0] * 32)
+
+
+def _meta(model_name: str, shifts: int, samplerate: int) -> str:
+    return f"{model_name}:{shifts}:{samplerate}"
+
+
+def _path(entry_id: str) -> Path:
+    return CACHE_DIR / f"{entry_id}.npz"
+
+
+def _ensure_entries() -> None:
+    """Load the fingerprints of stored entries (once per process, under _lock)."""
+    global _entries
+    if _entries is not None:
+        return
+    import numpy as np
+
+    _entries = {}
+    for path in CACHE_DIR.glob("*.npz"):
+        if ".tmp" in path.name:
+            continue
+        try:
+            with np.load(path) as data:
+                _entries[path.stem] = (str(data["meta"]), data["fp"])
+        except (OSError, KeyError, ValueError):
+            continue
+
+
+def lookup(meta: str, fp) -> str | None:
+    """Id of the stored segment closest to fp if its bit error rate is below MATCH_BER."""
+    import numpy as np
+
+    key = (meta, len(fp))
+    with _lock:
+        _ensure_entries()
+        if key not in _matrices:
+            ids = [i for i, (m, f) in _entries.items() if m == meta and len(f) == len(fp)]
+            matrix = np.stack([_entries[i][1] for i in ids]) if ids else None
+            _matrices[key] = (ids, matrix)
+        ids, matrix = _matrices[key]
+    if not ids or not len(fp):
+        return None
+    errors = bit_error_rates(matrix, fp)
+    best = int(np.argmin(errors))
+    if errors[best] >= MATCH_BER:
+        return None
+    return ids[best]
+
+
+def _forget(entry_id: str) -> None:
+    """Drop an entry from the in-memory fingerprints (under _lock)."""
+    if _entries is not None and _entries.pop(entry_id, None) is not None:
+        _matrices.clear()
+
+
+def load(entry_id: str, rms: float, channels: int, length: int):
+    """
+    Cached background for entry_id, rescaled to a segment of the given RMS.
+
+    Returns:
+        (background, pre, post): the segment's length samples with pre and
+        post samples of margin before and after it, or None on failure.
+    """
+    import numpy as np
+
+    path = _path(entry_id)
+    try:
+        with np.load(path) as data:
+            background = data["background"].astype(np.float32) * float(data["scale"])
+            stored_rms = float(data["rms"])
+            pre = int(data["pre"]) if "pre" in data.files else 0
+            post = int(data["post"]) if "post" in data.files else 0
+    except (OSError, KeyError, ValueError):
+        with _lock:
+            _forget(entry_id)
+        return None
+    if background.shape != (channels, pre + length + post):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    if stored_rms > 0:
+        background *= rms / stored_rms
+    return background, pre, post
+
+
+def store(meta: str, fp, background, rms: float, pre: int = 0, post: int = 0) -> None:
+    """
+    Store a separated segment as 16-bit PCM with its fingerprint.
+
+    background includes pre and post samples of margin around the segment,
+    used to crossfade into neighbouring segments.
+    """
+    import numpy as np
+
+    entry_id = hashlib.sha1(meta.encode() + fp.tobytes()).hexdigest()
+    peak = float(np.max(np.abs(background))) if background.size else 0.0
+    scale = peak / 32767 if peak > 0 else 1.0
+    path = _path(entry_id)
+    tmp = path.with_name(f"{entry_id}.{threading.get_ident()}.tmp.npz")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            tmp,
+            background=np.round(background / scale).astype(np.int16),
+            scale=np.float32(scale),
+            rms=np.float32(rms),
+            pre=np.int64(pre),
+            post=np.int64(post),
+            fp=fp,
+            meta=np.array(meta),
+        )
+        tmp.replace(path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return
+    with _lock:
+        _ensure_entries()
+        _entries[entry_id] = (meta, fp)
+        _matrices.pop((meta, len(fp)), None)
+
+
+def evict(max_bytes: int = MAX_CACHE_BYTES) -> None:
+    """Delete least recently used entries until the store fits in max_bytes."""
+    with _lock:
+        try:
+            entries = [(p, p.stat()) for p in CACHE_DIR.glob("*.npz") if ".tmp" not in p.name]
+        except OSError:
+            return
+        total = sum(st.st_size for _, st in entries)
+        for p, st in sorted(entries, key=lambda e: e[1].st_mtime):
+            if total <= max_bytes:
+                break
+            try:
+                p.unlink()
+                total -= st.st_size
+            except OSError:
+                continue
+            _forget(p.stem)
+
+
+def separate_with_cache(
+    audio,
+    samplerate: int,
+    model_name: str,
+    shifts: int,
+    separate: Callable[[int, int], object],
+):
+    """
+    Separate audio, reusing cached segments where fingerprints match.
+
+    Args:
+        audio: Input mixture as numpy array (channels, samples).
+        samplerate: Sample rate of audio.
+        model_name, shifts: Only segments separated the same way are reused.
+        separate: separate(start, end) -> background numpy array
+            (channels, end - start) for audio[:, start:end].
+
+    Returns:
+        (background, stats) where stats has segments, hits, hit_ratio,
+        hit_seconds, computed_seconds (audio actually separated) and
+        separation_seconds (time spent in separate, excluding cache work).
+    """
+    import numpy as np
+
+    channels, n = audio.shape
+    seg = int(SEGMENT_SECONDS * samplerate)
+    fade = int(CROSSFADE_SECONDS * samplerate)
+    meta = _meta(model_name, shifts, samplerate)
+    mono = audio.mean(axis=0)
+    full = n // seg
+    total = full + (1 if n % seg else 0)
+
+    fps, rms = [], []
+    for i in range(full):
+        part = mono[i * seg:(i + 1) * seg]
+        fps.append(sub_fingerprints(part, samplerate))
+        rms.append(float(np.sqrt(np.mean(np.square(part)))))
+
+    out = np.zeros((channels, n), dtype=np.float32)
+    hit = [False] * total
+    # Margins of cached segments: pre ends at, post starts at the segment's edge
+    margins: dict[int, tuple[object, object]] = {}
+    for i in range(full):
+        entry_id = lookup(meta, fps[i])
+        cached = load(entry_id, rms[i], channels, seg) if entry_id else None
+        if cached is not None:
+            background, pre, post = cached
+            out[:, i * seg:(i + 1) * seg] = background[:, pre:pre + seg]
+            margins[i] = (background[:, pre - fade:pre] if pre >= fade else None,
+                          background[:, pre + seg:pre + seg + fade] if post >= fade else None)
+            hit[i] = True
+
+    # Neighbouring hits may come from different videos and RMS rescales;
+    # crossfade into the next one's lead-in, or out through this one's tail
+    for i in range(1, full):
+        if not (hit[i - 1] and hit[i]) or not fade:
+            continue
+        b = i * seg
+        lead_in, tail = margins[i][0], margins[i - 1][1]
+        if lead_in is not None:
+            w = np.linspace(0.0, 1.0, fade, endpoint=False, dtype=np.float32)
+            out[:, b - fade:b] = out[:, b - fade:b] * (1 - w) + lead_in * w
+        elif tail is not None:
+            w = np.linspace(1.0, 0.0, fade, endpoint=False, dtype=np.float32)
+            out[:, b:b + fade] = tail * w + out[:, b:b + fade] * (1 - w)
+
+    computed = 0
+    separation_seconds = 0.0
+    i = 0
+    while i < total:
+        if hit[i]:
+            i += 1
+            continue
+        j = i
+        while j < total and not hit[j]:
+            j += 1
+        start, end = i * seg, min(j * seg, n)
+        # Separate a little into the cached neighbours and crossfade over that overlap
+        lo, hi = max(0, start - fade), min(n, end + fade)
+        started = time.perf_counter()
+        fresh = separate(lo, hi)
+        separation_seconds += time.perf_counter() - started
+        computed += hi - lo
+        out[:, start:end] = fresh[:, start - lo:end - lo]
+        if start > lo:
+            w = np.linspace(0.0, 1.0, start - lo, endpoint=False, dtype=np.float32)
+            out[:, lo:start] = out[:, lo:start] * (1 - w) + fresh[:, :start - lo] * w
+        if hi > end:
+            w = np.linspace(1.0, 0.0, hi - end, endpoint=False, dtype=np.float32)
+            out[:, end:hi] = out[:, end:hi] * (1 - w) + fresh[:, end - lo:] * w
+        for k in range(i, min(j, full)):
+            pre = min(fade, k * seg - lo)
+            post = min(fade, hi - (k + 1) * seg)
+            store(meta, fps[k], fresh[:, k * seg - pre - lo:(k + 1) * seg + post - lo], rms[k], pre, post)
+        i = j
+
+    if computed:
+        evict()
+    hits = sum(hit)
+    stats = {
+        "segments": total,
+        "hits": hits,
+        "hit_ratio": hits / total if total else 0.0,
+        "hit_seconds": hits * seg / samplerate,
+        "computed_seconds": computed / samplerate,
+        "separation_seconds": separation_seconds,
+    }
+    return out, stats
@@ -0,0 +1,58 @@
+"""
+Background warm-up: import torch/demucs and load the default model while the
+UI is idle, so the first job does not wait for it.
+Disable with AUDIOSTEM_NO_WARMUP=1 (e.g. on machines short of memory).
+"""
+
+import os
+import threading
+import time
+
+_state = {"status": "idle", "model_name": None, "seconds": None, "error": None}
+_thread: threading.Thread | None = None
+
+
+def start_warmup(model_name: str = "htdemucs") -> threading.Thread | None:
+    """
+    Start warming up in a daemon thread (once per process).
+
+    Returns:
+        The warm-up thread, or None if warm-up is disabled.
+    """
+    global _thread
+    if os.environ.get("AUDIOSTEM_NO_WARMUP") == "1":
+        _state["status"] = "disabled"
+        return None
+    if _thread is None:
+        _state.update(status="running", model_name=model_name)
+        _thread = threading.Thread(target=_warm, args=(model_name,), name="warmup", daemon=True)
+        _thread.start()
+    return _thread
+
+
+def _warm(model_name: str) -> None:
+    started = time.perf_counter()
+    try:
+        import torch
+        import demucs.apply  # noqa: F401
+        import demucs.audio  # noqa: F401
+        import demucs.separate  # noqa: F401
+
+        from .estimator import set_device
+        from .pipeline import load_model
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Estimates made before the first job should use this machine's device
+        set_device(device)
+        load_model(model_name, device)
+    except Exception as e:
+        # A failed warm-up is not fatal; the first job loads the model itself
+        _state.update(status="error", error=str(e))
+    else:
+        _state["status"] = "done"
+    _state["seconds"] = time.perf_counter() - started
+
+
+def warmup_status() -> dict:
+    """Current warm-up state: status (idle/running/done/error/disabled), model_name, seconds, error."""
+    return dict(_state)
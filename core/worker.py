@@ -15,15 +15,22 @@ class StemWorker(QThread):
 
     status = pyqtSignal(str)
     progress = pyqtSignal(int)
+    output_file = pyqtSignal(str)
     finished_ok = pyqtSignal(str)
     error = pyqtSignal(str)
+    info = pyqtSignal(dict)
 
     def __init__(
         self,
         video_path: str,
         output_dir: str | None = None,
         model_name: str = "htdemucs",
-        shifts: int = 1,
+        shifts: int | str = 1,
+        deadline: float | None = None,
+        preview: bool = False,
+        preview_start: float | None = None,
+        audio_duration: float | None = None,
+        segment_cache: bool = True,
         parent=None,
     ):
         super().__init__(parent)
@@ -31,6 +38,11 @@ class StemWorker(QThread):
         self._output_dir = Path(output_dir).resolve() if output_dir else None
         self._model_name = model_name
         self._shifts = shifts
+        self._deadline = deadline
+        self._preview = preview
+        self._preview_start = preview_start
+        self._audio_duration = audio_duration
+        self._segment_cache = segment_cache
 
     def run(self):
         def on_progress(status: str, progress: int):
@@ -44,7 +56,14 @@ class StemWorker(QThread):
                 progress_callback=on_progress,
                 model_name=self._model_name,
                 shifts=self._shifts,
+                deadline=self._deadline,
+                info_callback=self.info.emit,
+                preview=self._preview,
+                preview_start=self._preview_start,
+                audio_duration=self._audio_duration,
+                segment_cache=self._segment_cache,
             )
+            self.output_file.emit(str(out_path))
             self.finished_ok.emit(str(out_path.parent))
         except Exception as e:
             self.error.emit(str(e))
@@ -16,8 +16,42 @@
     const downloadBtn = document.getElementById("downloadBtn");
     const errorSection = document.getElementById("errorSection");
     const errorMessage = document.getElementById("errorMessage");
+    const modelSelect = document.getElementById("modelSelect");
+    const qualitySelect = document.getElementById("qualitySelect");
+    const deadlineInput = document.getElementById("deadlineInput");
+    const deadlineFields = document.querySelectorAll(".deadline-field");
+    const estimateText = document.getElementById("estimateText");
+    const progressEstimate = document.getElementById("progressEstimate");
+    const browserExtract = document.getElementById("browserExtract");
+    const browserExtractOption = document.getElementById("browserExtractOption");
+    const segmentCache = document.getElementById("segmentCache");
+    const previewBtn = document.getElementById("previewBtn");
+    const previewStartInput = document.getElementById("previewStartInput");
+    const resultMessage = document.getElementById("resultMessage");
+    const previewPlayer = document.getElementById("previewPlayer");
+    const promoteBtn = document.getElementById("promoteBtn");
+    const cacheText = document.getElementById("cacheText");
 
     const ALLOWED = ["mp4", "mov", "avi", "mkv", "webm", "m4v"];
+    const AUTO_PROFILE = "auto";
+    // Matches the server's extraction (core/audio_utils.extract_audio_to_wav): mono, 44.1 kHz, 16-bit.
+    const TARGET_SAMPLE_RATE = 44100;
+    // decodeAudioData holds the whole file plus its full-length float PCM in memory
+    // (about 21 MB per stereo minute), so only short videos are decoded in the page;
+    // the rest are uploaded as video.
+    const BROWSER_DECODE_MAX_BYTES = 200 * 1024 * 1024;
+    const BROWSER_DECODE_MAX_SECONDS = 15 * 60;
+    // Samples converted per step before yielding to the UI thread.
+    const ENCODE_CHUNK_SAMPLES = 1 << 18;
+    const browserDecodeSupported = typeof window.OfflineAudioContext === "function";
+
+    if (!browserDecodeSupported) {
+        browserExtract.checked = false;
+        browserExtractOption.style.display = "none";
+    }
+
+    let fileDuration = null;
+    let previewJobId = null;
 
     function isVideoFile(name) {
         const ext = (name || "").split(".").pop().toLowerCase();
@@ -27,16 +61,172 @@
     function setFile(name) {
         fileNameEl.textContent = name || "";
         submitBtn.disabled = !name;
+        previewBtn.disabled = !name;
+    }
+
+    function setBusy(busy) {
+        submitBtn.disabled = busy;
+        previewBtn.disabled = busy;
+        btnText.style.display = busy ? "none" : "";
+        btnLoader.style.display = busy ? "inline-flex" : "none";
+    }
+
+    function describePlan(plan) {
+        const shifts = plan.shifts + (plan.shifts === 1 ? " shift" : " shifts");
+        return "Estimated time: ~" + plan.estimate_label + " (" + plan.model_name + ", " + shifts + ")";
+    }
+
+    function describeCache(cache) {
+        if (!cache || !cache.cache_hits) return "";
+        return "Reused " + cache.cache_hits + " of " + cache.cache_segments + " segments from cache (" +
+            Math.round(cache.cache_hit_ratio * 100) + "%), ~" + cache.cache_time_saved_label + " saved";
+    }
+
+    function updateEstimate() {
+        const auto = qualitySelect.value === AUTO_PROFILE;
+        deadlineFields.forEach(function (el) {
+            el.style.display = auto ? "" : "none";
+        });
+        if (!fileDuration) {
+            estimateText.textContent = "";
+            return;
+        }
+        const params = new URLSearchParams({
+            duration: fileDuration,
+            model_name: modelSelect.value,
+            shifts: qualitySelect.value,
+            deadline_minutes: auto ? deadlineInput.value : "",
+        });
+        fetch("/estimate?" + params.toString())
+            .then(function (r) {
+                if (!r.ok) throw new Error("Estimate request failed");
+                return r.json();
+            })
+            .then(function (plan) {
+                estimateText.textContent = describePlan(plan);
+            })
+            .catch(function () {
+                estimateText.textContent = "";
+            });
+    }
+
+    function probeDuration(file) {
+        fileDuration = null;
+        updateEstimate();
+        if (!file) return;
+        const url = URL.createObjectURL(file);
+        const video = document.createElement("video");
+        video.preload = "metadata";
+        video.onloadedmetadata = function () {
+            URL.revokeObjectURL(url);
+            if (isFinite(video.duration) && video.duration > 0) {
+                fileDuration = video.duration;
+                updateEstimate();
+            }
+        };
+        video.onerror = function () {
+            URL.revokeObjectURL(url);
+        };
+        video.src = url;
     }
 
+    function decodeAudio(file) {
+        return file.arrayBuffer().then(function (data) {
+            const ctx = new OfflineAudioContext(1, 1, TARGET_SAMPLE_RATE);
+            return new Promise(function (resolve, reject) {
+                ctx.decodeAudioData(data, resolve, reject);
+            });
+        });
+    }
+
+    function wavHeader(length, sampleRate) {
+        const out = new DataView(new ArrayBuffer(44));
+        const writeString = function (offset, str) {
+            for (let i = 0; i < str.length; i++) out.setUint8(offset + i, str.charCodeAt(i));
+        };
+        writeString(0, "RIFF");
+        out.setUint32(4, 36 + length * 2, true);
+        writeString(8, "WAVE");
+        writeString(12, "fmt ");
+        out.setUint32(16, 16, true);
+        out.setUint16(20, 1, true);
+        out.setUint16(22, 1, true);
+        out.setUint32(24, sampleRate, true);
+        out.setUint32(28, sampleRate * 2, true);
+        out.setUint16(32, 2, true);
+        out.setUint16(34, 16, true);
+        writeString(36, "data");
+        out.setUint32(40, length * 2, true);
+        return out;
+    }
+
+    // Downmixes to mono 16-bit PCM in chunks, yielding between them so the page stays responsive.
+    function encodeWav(audioBuffer) {
+        const length = audioBuffer.length;
+        const channels = audioBuffer.numberOfChannels;
+        if (!length || !channels) return Promise.reject(new Error("No audio track"));
+        const data = [];
+        for (let c = 0; c < channels; c++) data.push(audioBuffer.getChannelData(c));
+        const parts = [wavHeader(length, audioBuffer.sampleRate)];
+
+        return new Promise(function (resolve) {
+            let offset = 0;
+            function step() {
+                const end = Math.min(length, offset + ENCODE_CHUNK_SAMPLES);
+                const chunk = new Int16Array(end - offset);
+                for (let i = offset; i < end; i++) {
+                    let sample = 0;
+                    for (let c = 0; c < channels; c++) sample += data[c][i];
+                    sample = Math.max(-1, Math.min(1, sample / channels));
+                    chunk[i - offset] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+                }
+                parts.push(chunk);
+                offset = end;
+                if (offset < length) {
+                    progressMessage.textContent = "Extracting audio in browser… " +
+                        Math.round((offset / length) * 100) + "%";
+                    setTimeout(step, 0);
+                } else {
+                    resolve(new Blob(parts, { type: "audio/wav" }));
+                }
+            }
+            step();
+        });
+    }
+
+    // Resolves to a WAV blob, or null when the video should be uploaded as is.
+    function extractInBrowser(file) {
+        if (!browserDecodeSupported || !browserExtract.checked || file.size > BROWSER_DECODE_MAX_BYTES) {
+            return Promise.resolve(null);
+        }
+        if (fileDuration && fileDuration > BROWSER_DECODE_MAX_SECONDS) {
+            return Promise.resolve(null);
+        }
+        progressMessage.textContent = "Extracting audio in browser…";
+        return decodeAudio(file)
+            .then(encodeWav)
+            .catch(function () {
+                return null;
+            });
+    }
+
+    modelSelect.addEventListener("change", updateEstimate);
+    qualitySelect.addEventListener("change", updateEstimate);
+    deadlineInput.addEventListener("change", updateEstimate);
+
     fileUploadArea.addEventListener("click", function () {
         fileInput.click();
     });
 
     fileInput.addEventListener("change", function () {
         const f = fileInput.files[0];
-        if (f && isVideoFile(f.name)) setFile(f.name);
-        else setFile("");
+        if (f && isVideoFile(f.name)) {
+            setFile(f.name);
+            probeDuration(f);
+        } else {
+            setFile("");
+            probeDuration(null);
+        }
     });
 
     fileUploadArea.addEventListener("dragover", function (e) {
@@ -57,8 +247,10 @@
         if (f && isVideoFile(f.name)) {
             fileInput.files = e.dataTransfer.files;
             setFile(f.name);
+            probeDuration(f);
         } else {
             setFile("");
+            probeDuration(null);
         }
     });
 
@@ -68,11 +260,23 @@
         errorSection.style.display = "none";
     }
 
-    function showResult(downloadUrl) {
+    function showResult(jobId, isPreview) {
         progressSection.style.display = "none";
         resultSection.style.display = "block";
         errorSection.style.display = "none";
-        downloadBtn.href = downloadUrl;
+        downloadBtn.href = "/download/" + jobId;
+        previewJobId = isPreview ? jobId : null;
+        if (isPreview) {
+            resultMessage.textContent = "Preview ready. Listen, then run the full job if it sounds right.";
+            previewPlayer.src = "/download/" + jobId;
+            previewPlayer.style.display = "";
+            promoteBtn.style.display = "";
+        } else {
+            resultMessage.textContent = "Background music extracted. No vocals.";
+            previewPlayer.removeAttribute("src");
+            previewPlayer.style.display = "none";
+            promoteBtn.style.display = "none";
+        }
     }
 
     function showError(msg) {
@@ -93,18 +297,16 @@
                 progressFill.style.width = pct + "%";
                 progressPercentage.textContent = pct + "%";
                 progressMessage.textContent = data.message || "";
+                progressEstimate.textContent = data.estimate ? describePlan(data.estimate) : "";
 
                 if (data.status === "done") {
-                    submitBtn.disabled = false;
-                    btnText.style.display = "";
-                    btnLoader.style.display = "none";
-                    showResult("/download/" + jobId);
+                    setBusy(false);
+                    cacheText.textContent = describeCache(data.cache);
+                    showResult(jobId, data.preview);
                     return;
                 }
                 if (data.status === "error") {
-                    submitBtn.disabled = false;
-                    btnText.style.display = "";
-                    btnLoader.style.display = "none";
+                    setBusy(false);
                     showError(data.message || "Unknown error");
                     return;
                 }
@@ -113,35 +315,56 @@
                 }, 600);
             })
             .catch(function (err) {
-                submitBtn.disabled = false;
-                btnText.style.display = "";
-                btnLoader.style.display = "none";
+                setBusy(false);
                 showError(err.message || "Network error");
             });
     }
 
-    form.addEventListener("submit", function (e) {
-        e.preventDefault();
+    // Model, quality, deadline and cache options as currently selected in the form
+    function jobOptions() {
+        const fd = new FormData();
+        fd.append("model_name", modelSelect.value);
+        fd.append("shifts", qualitySelect.value);
+        if (qualitySelect.value === AUTO_PROFILE) fd.append("deadline_minutes", deadlineInput.value);
+        fd.append("segment_cache", segmentCache.checked ? "1" : "0");
+        return fd;
+    }
+
+    function startJob(preview) {
         const f = fileInput.files[0];
         if (!f || !isVideoFile(f.name)) return;
 
-        const fd = new FormData();
-        fd.append("file", f);
-        fd.append("model_name", document.getElementById("modelSelect").value);
-        fd.append("shifts", document.getElementById("qualitySelect").value);
+        const fd = jobOptions();
+        if (preview) {
+            fd.append("preview", "1");
+            // Empty lets the server pick the loudest section
+            if (previewStartInput.value !== "") fd.append("preview_start", previewStartInput.value);
+        }
 
-        submitBtn.disabled = true;
-        btnText.style.display = "none";
-        btnLoader.style.display = "inline-flex";
+        setBusy(true);
         showProgress();
         progressFill.style.width = "0%";
         progressPercentage.textContent = "0%";
         progressMessage.textContent = "Uploading…";
+        progressEstimate.textContent = "";
 
-        fetch("/upload", {
-            method: "POST",
-            body: fd,
-        })
+        extractInBrowser(f)
+            .then(function (wavBlob) {
+                let url = "/upload";
+                if (wavBlob) {
+                    url = "/upload-audio";
+                    fd.append("file", wavBlob, f.name.replace(/\.[^.]*$/, "") + ".wav");
+                    fd.append("source_name", f.name);
+                    progressMessage.textContent = "Uploading audio…";
+                } else {
+                    fd.append("file", f);
+                    progressMessage.textContent = "Uploading video…";
+                }
+                return fetch(url, {
+                    method: "POST",
+                    body: fd,
+                });
+            })
             .then(function (r) {
                 if (!r.ok) return r.json().then(function (d) {
                     throw new Error(d.error || "Upload failed");
@@ -153,10 +376,42 @@
                 pollProgress(data.job_id);
             })
             .catch(function (err) {
-                submitBtn.disabled = false;
-                btnText.style.display = "";
-                btnLoader.style.display = "none";
+                setBusy(false);
                 showError(err.message || "Upload failed");
             });
+    }
+
+    form.addEventListener("submit", function (e) {
+        e.preventDefault();
+        startJob(false);
+    });
+
+    previewBtn.addEventListener("click", function () {
+        startJob(true);
+    });
+
+    promoteBtn.addEventListener("click", function () {
+        if (!previewJobId) return;
+        const jobId = previewJobId;
+        setBusy(true);
+        showProgress();
+        progressFill.style.width = "0%";
+        progressPercentage.textContent = "0%";
+        progressMessage.textContent = "Starting full job…";
+        progressEstimate.textContent = "";
+        fetch("/promote/" + jobId, { method: "POST", body: jobOptions() })
+            .then(function (r) {
+                if (!r.ok) return r.json().then(function (d) {
+                    throw new Error(d.error || "Could not start full job");
+                });
+                return r.json();
+            })
+            .then(function (data) {
+                pollProgress(data.job_id);
+            })
+            .catch(function (err) {
+                setBusy(false);
+                showError(err.message || "Could not start full job");
+            });
     });
 })();
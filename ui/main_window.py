@@ -5,10 +5,11 @@ Main window: dark theme, drag-and-drop, progress, status, Open Output Folder.
 import sys
 from pathlib import Path
 
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QFont
 from PyQt6.QtWidgets import (
     QApplication,
+    QCheckBox,
     QComboBox,
     QFileDialog,
     QFormLayout,
@@ -18,12 +19,15 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QProgressBar,
     QPushButton,
+    QSpinBox,
     QVBoxLayout,
     QWidget,
 )
 
 from core.audio_utils import check_ffmpeg_available
-from core.pipeline import DEMUCS_MODELS, QUALITY_PROFILES
+from core.estimator import format_duration
+from core.pipeline import AUTO_PROFILE, DEMUCS_MODELS, PREVIEW_SECONDS, QUALITY_PROFILES
+from core.segment_cache import ENABLED as SEGMENT_CACHE_ENABLED
 from core.worker import StemWorker
 
 
@@ -111,16 +115,26 @@ class DropZone(QFrame):
 
 
 class MainWindow(QMainWindow):
+    """Main window; job_finished(ok) fires when a job ends (used by the startup benchmark)."""
+
+    job_finished = pyqtSignal(bool)
+
     def __init__(self):
         super().__init__()
         self._worker: StemWorker | None = None
         self._output_dir: str | None = None
+        self._output_file: str | None = None
+        self._job_source: Path | None = None
+        self._job_is_preview = False
+        self._source_duration: float | None = None
+        self._cache_info: dict | None = None
         self.setWindowTitle("AudioStem-Pro — Extract background music")
         self.setMinimumSize(520, 420)
         self.resize(560, 460)
         self._build_ui()
         self._apply_styles()
-        self._check_ffmpeg()
+        # Runs a subprocess; defer it so it does not delay the first paint
+        QTimer.singleShot(0, self._check_ffmpeg)
 
     def _build_ui(self):
         central = QWidget()
@@ -152,7 +166,32 @@ class MainWindow(QMainWindow):
         for shifts, label in QUALITY_PROFILES:
             self._quality_combo.addItem(label, shifts)
         self._quality_combo.setObjectName("combo")
+        self._quality_combo.currentIndexChanged.connect(self._on_quality_changed)
         opts_layout.addRow("Quality:", self._quality_combo)
+        self._deadline_spin = QSpinBox()
+        self._deadline_spin.setRange(0, 24 * 60)
+        self._deadline_spin.setSuffix(" min")
+        self._deadline_spin.setSpecialValueText("Automatic")
+        self._deadline_spin.setObjectName("combo")
+        self._deadline_spin.setEnabled(False)
+        opts_layout.addRow("Deadline:", self._deadline_spin)
+        self._preview_check = QCheckBox(f"Preview first ({int(PREVIEW_SECONDS)} s excerpt, fast)")
+        opts_layout.addRow("Preview:", self._preview_check)
+        self._preview_start_spin = QSpinBox()
+        # -1 (shown as "Loudest part") lets the pipeline pick the excerpt
+        self._preview_start_spin.setRange(-1, 24 * 3600)
+        self._preview_start_spin.setValue(-1)
+        self._preview_start_spin.setSuffix(" s")
+        self._preview_start_spin.setSpecialValueText("Loudest part")
+        self._preview_start_spin.setObjectName("combo")
+        self._preview_start_spin.setEnabled(False)
+        self._preview_check.toggled.connect(self._preview_start_spin.setEnabled)
+        opts_layout.addRow("Preview start:", self._preview_start_spin)
+        self._cache_check = QCheckBox("Reuse segments separated for earlier videos")
+        self._cache_check.setChecked(SEGMENT_CACHE_ENABLED)
+        # AUDIOSTEM_SEGMENT_CACHE=0 turns the cache off for good
+        self._cache_check.setEnabled(SEGMENT_CACHE_ENABLED)
+        opts_layout.addRow("Segment cache:", self._cache_check)
         layout.addLayout(opts_layout)
 
         self._drop_zone = DropZone(self)
@@ -175,12 +214,29 @@ class MainWindow(QMainWindow):
         self._status.setObjectName("statusLabel")
         layout.addWidget(self._status)
 
+        self._estimate = QLabel("")
+        self._estimate.setObjectName("statusLabel")
+        self._estimate.setVisible(False)
+        layout.addWidget(self._estimate)
+
         self._open_folder_btn = QPushButton("Open Output Folder")
         self._open_folder_btn.setObjectName("secondaryButton")
         self._open_folder_btn.setVisible(False)
         self._open_folder_btn.clicked.connect(self._on_open_folder)
         layout.addWidget(self._open_folder_btn)
 
+        self._play_preview_btn = QPushButton("Play Preview")
+        self._play_preview_btn.setObjectName("secondaryButton")
+        self._play_preview_btn.setVisible(False)
+        self._play_preview_btn.clicked.connect(self._on_play_preview)
+        layout.addWidget(self._play_preview_btn)
+
+        self._promote_btn = QPushButton("Run Full Job")
+        self._promote_btn.setObjectName("primaryButton")
+        self._promote_btn.setVisible(False)
+        self._promote_btn.clicked.connect(self._on_promote)
+        layout.addWidget(self._promote_btn)
+
         layout.addStretch(1)
 
     def _apply_styles(self):
@@ -254,6 +310,17 @@ class MainWindow(QMainWindow):
             QComboBox#combo:hover {{
                 border-color: {ACCENT};
             }}
+            QSpinBox#combo {{
+                background: {BG_CARD};
+                color: {TEXT};
+                border: 1px solid {TEXT_DIM};
+                border-radius: 6px;
+                padding: 6px 10px;
+                min-width: 200px;
+            }}
+            QSpinBox#combo:disabled {{
+                color: {TEXT_DIM};
+            }}
         """)
 
     def _check_ffmpeg(self):
@@ -261,6 +328,9 @@ class MainWindow(QMainWindow):
         if not ok:
             QMessageBox.warning(self, "FFmpeg not found", msg)
 
+    def _on_quality_changed(self, _index: int):
+        self._deadline_spin.setEnabled(self._quality_combo.currentData() == AUTO_PROFILE)
+
     def _on_select_clicked(self):
         path, _ = QFileDialog.getOpenFileName(
             self,
@@ -278,19 +348,53 @@ class MainWindow(QMainWindow):
         if not path.exists():
             QMessageBox.warning(self, "File not found", f"File does not exist:\n{path}")
             return
+        self._source_duration = None
+        self._start_job(path, preview=self._preview_check.isChecked())
+
+    def _on_promote(self):
+        """Run the full job on the previewed video, reusing its probed duration."""
+        if self._worker and self._worker.isRunning():
+            return
+        if not self._job_source or not self._job_source.exists():
+            QMessageBox.warning(self, "File not found", "The previewed video is no longer available.")
+            return
+        self._start_job(self._job_source, preview=False)
+
+    def _start_job(self, path: Path, preview: bool):
+        self._job_source = path
+        self._job_is_preview = preview
         self._output_dir = None
+        self._output_file = None
+        self._cache_info = None
         self._open_folder_btn.setVisible(False)
+        self._play_preview_btn.setVisible(False)
+        self._promote_btn.setVisible(False)
         self._progress.setVisible(True)
         self._progress.setValue(0)
         self._status.setText("Starting…")
+        self._estimate.setVisible(False)
         self._drop_zone.set_text(path.name)
         self._select_btn.setEnabled(False)
 
         model_name = self._model_combo.currentData()
         shifts = self._quality_combo.currentData()
-        self._worker = StemWorker(str(path), model_name=model_name, shifts=shifts)
+        deadline = self._deadline_spin.value() * 60 if shifts == AUTO_PROFILE else 0
+        preview_start = self._preview_start_spin.value()
+        preview_start = preview_start if preview and preview_start >= 0 else None
+        self._worker = StemWorker(
+            str(path),
+            model_name=model_name,
+            shifts=shifts,
+            deadline=deadline or None,
+            preview=preview,
+            preview_start=preview_start,
+            audio_duration=self._source_duration,
+            segment_cache=self._cache_check.isChecked(),
+        )
         self._worker.status.connect(self._on_status)
+        self._worker.info.connect(self._on_info)
         self._worker.progress.connect(self._on_progress)
+        self._worker.output_file.connect(self._on_output_file)
         self._worker.finished_ok.connect(self._on_finished_ok)
         self._worker.error.connect(self._on_error)
         self._worker.finished.connect(self._on_worker_finished)
@@ -299,16 +403,46 @@ class MainWindow(QMainWindow):
     def _on_status(self, text: str):
         self._status.setText(text)
 
+    def _on_info(self, info: dict):
+        if "cache_hits" in info:
+            self._cache_info = info
+            return
+        shifts = info["shifts"]
+        self._estimate.setText(
+            f"Estimated time: ~{format_duration(info['estimate_seconds'])} "
+            f"({info['model_name']}, {shifts} shift{'s' if shifts != 1 else ''})"
+        )
+        self._estimate.setVisible(True)
+        if self._job_is_preview:
+            self._source_duration = info.get("source_duration")
+
+    def _on_output_file(self, path: str):
+        self._output_file = path
+
     def _on_progress(self, value: int):
         self._progress.setValue(value)
 
     def _on_finished_ok(self, output_dir: str):
         self._output_dir = output_dir
-        self._status.setText("Done")
         self._progress.setValue(100)
         self._open_folder_btn.setVisible(True)
+        if self._job_is_preview:
+            self._status.setText("Preview ready — play it, then run the full job")
+            self._play_preview_btn.setVisible(True)
+            self._promote_btn.setVisible(True)
+        else:
+            self._status.setText("Done")
+        if self._cache_info and self._cache_info["cache_hits"]:
+            c = self._cache_info
+            self._estimate.setText(
+                f"Reused {c['cache_hits']} of {c['cache_segments']} segments from cache "
+                f"({c['cache_hit_ratio']:.0%}), ~{format_duration(c['cache_time_saved'])} saved"
+            )
+            self._estimate.setVisible(True)
+        self.job_finished.emit(True)
 
     def _on_error(self, message: str):
+        self.job_finished.emit(False)
         QMessageBox.critical(self, "Error", message)
         self._status.setText("Error")
         self._progress.setValue(0)
@@ -321,12 +455,22 @@ class MainWindow(QMainWindow):
         if not self._output_dir or not Path(self._output_dir).exists():
             QMessageBox.warning(self, "Folder not found", "Output folder is no longer available.")
             return
+        self._open_path(self._output_dir)
+
+    def _on_play_preview(self):
+        if not self._output_file or not Path(self._output_file).exists():
+            QMessageBox.warning(self, "File not found", "Preview file is no longer available.")
+            return
+        self._open_path(self._output_file)
+
+    @staticmethod
+    def _open_path(path: str):
+        """Open a file or folder with the system's default application."""
+        import subprocess
+
         if sys.platform == "darwin":
-            import subprocess
-            subprocess.run(["open", self._output_dir], check=False)
+            subprocess.run(["open", path], check=False)
         elif sys.platform == "win32":
-            import subprocess
-            subprocess.run(["explorer", self._output_dir], check=False)
+            subprocess.run(["explorer", path], check=False)
         else:
-            import subprocess
-            subprocess.run(["xdg-open", self._output_dir], check=False)
+            subprocess.run(["xdg-open", path], check=False)
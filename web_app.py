@@ -9,14 +9,18 @@ __author__ = "Eduarth Schmidt"
 
 import os
 import threading
+import time
 import uuid
 from pathlib import Path
 
 from flask import Flask, jsonify, render_template, request, send_file
 from werkzeug.utils import secure_filename
 
-from core.audio_utils import check_ffmpeg_available
-from core.pipeline import DEMUCS_MODELS, QUALITY_PROFILES, run_pipeline
+from core.audio_utils import check_ffmpeg_available, is_pcm_wav
+from core.estimator import choose_profile, estimate_seconds, format_duration
+from core.pipeline import AUTO_PROFILE, DEMUCS_MODELS, QUALITY_PROFILES, run_pipeline
+from core.segment_cache import ENABLED as SEGMENT_CACHE_ENABLED
+from core.warmup import start_warmup, warmup_status
 
 VALID_MODELS = {"htdemucs", "mdx_extra_q", "htdemucs_6s"}
 VALID_SHIFTS = {s for s, _ in QUALITY_PROFILES}
@@ -32,40 +36,135 @@ app.config["OUTPUT_FOLDER"].mkdir(parents=True, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {"mp4", "mov", "avi", "mkv", "webm", "m4v"}
 JOBS: dict[str, dict] = {}
+# Uploads of previews are kept this long so they can be promoted to a full job.
+PREVIEW_RETENTION_SECONDS = 3600
+# How often the server looks for stale uploads, even when no jobs are started.
+UPLOAD_CLEANUP_INTERVAL_SECONDS = 300
 
 
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-@app.route("/")
-def index():
-    return render_template("index.html", models=DEMUCS_MODELS, quality_profiles=QUALITY_PROFILES)
+def parse_options(values) -> tuple[str, int | str, float | None]:
+    """Read model_name, shifts and deadline_minutes from form or query values."""
+    model_name = values.get("model_name", "htdemucs").strip()
+    if model_name not in VALID_MODELS:
+        model_name = "htdemucs"
+    shifts = values.get("shifts", 1)
+    if shifts != AUTO_PROFILE:
+        try:
+            shifts = int(shifts)
+        except (TypeError, ValueError):
+            shifts = 1
+    if shifts not in VALID_SHIFTS:
+        shifts = 1
+    try:
+        deadline = float(values.get("deadline_minutes", "")) * 60
+    except (TypeError, ValueError):
+        deadline = None
+    if deadline is not None and deadline <= 0:
+        deadline = None
+    return model_name, shifts, deadline
 
 
-@app.route("/upload", methods=["POST"])
-def upload():
-    if "file" not in request.files:
-        return jsonify({"error": "No file provided"}), 400
-    f = request.files["file"]
-    if f.filename == "":
-        return jsonify({"error": "No file selected"}), 400
-    if not allowed_file(f.filename):
-        return jsonify({"error": "File type not allowed. Use .mp4, .mov, etc."}), 400
+def unique_upload_path(filename: str) -> Path:
+    """Per-upload path, so uploads with the same name never replace each other."""
+    return app.config["UPLOAD_FOLDER"] / f"{uuid.uuid4().hex}_{filename}"
 
-    filename = secure_filename(f.filename)
-    filepath = app.config["UPLOAD_FOLDER"] / filename
-    f.save(str(filepath))
 
-    model_name = request.form.get("model_name", "htdemucs").strip()
-    if model_name not in VALID_MODELS:
-        model_name = "htdemucs"
+def parse_preview(values) -> tuple[bool, float | None]:
+    """Read preview and preview_start (seconds) from form values."""
+    preview = values.get("preview", "") in ("1", "true", "on")
     try:
-        shifts = int(request.form.get("shifts", 1))
+        preview_start = float(values.get("preview_start", ""))
     except (TypeError, ValueError):
-        shifts = 1
-    if shifts not in VALID_SHIFTS:
-        shifts = 1
+        preview_start = None
+    if preview_start is not None and preview_start < 0:
+        preview_start = None
+    return preview, preview_start
+
+
+def parse_segment_cache(values) -> bool:
+    """Read segment_cache from form values; the cache is on unless sent as "0"."""
+    return SEGMENT_CACHE_ENABLED and values.get("segment_cache", "1") != "0"
+
+
+def active_jobs() -> int:
+    return sum(1 for j in JOBS.values() if j["status"] in ("starting", "running"))
+
+
+def cleanup_stale_uploads() -> None:
+    """
+    Delete uploads of previews that were not promoted in time, and files in the
+    upload folder no job refers to (e.g. left by an earlier server process)
+    once they are older than PREVIEW_RETENTION_SECONDS.
+    """
+    now = time.time()
+    in_use = set()
+    for j in list(JOBS.values()):
+        source = j.get("source_path")
+        finished_at = j.get("finished_at")
+        if j["status"] in ("starting", "running"):
+            in_use.add(j["upload_path"])
+        if not source:
+            continue
+        if not finished_at or now - finished_at < PREVIEW_RETENTION_SECONDS:
+            in_use.add(source)
+            continue
+        j["source_path"] = None
+        try:
+            Path(source).unlink(missing_ok=True)
+        except OSError:
+            pass
+    try:
+        uploads = list(app.config["UPLOAD_FOLDER"].iterdir())
+    except OSError:
+        return
+    for path in uploads:
+        if str(path) in in_use:
+            continue
+        try:
+            # Files still being received keep a recent mtime
+            if path.is_file() and now - path.stat().st_mtime >= PREVIEW_RETENTION_SECONDS:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def start_upload_cleanup() -> threading.Thread:
+    """Run cleanup_stale_uploads now and then every UPLOAD_CLEANUP_INTERVAL_SECONDS."""
+    def loop():
+        while True:
+            cleanup_stale_uploads()
+            time.sleep(UPLOAD_CLEANUP_INTERVAL_SECONDS)
+
+    thread = threading.Thread(target=loop, name="upload-cleanup", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_job(
+    filepath: Path,
+    *,
+    model_name: str,
+    shifts: int | str,
+    deadline: float | None,
+    skip_extraction: bool = False,
+    preview: bool = False,
+    preview_start: float | None = None,
+    audio_duration: float | None = None,
+    output_stem: str | None = None,
+    segment_cache: bool = True,
+) -> str:
+    """
+    Run the pipeline on an uploaded file in a background thread; returns the job id.
+
+    The upload is deleted when the job ends, except after a successful preview:
+    then it is kept as the job's source_path until promoted or stale.
+    """
+    cleanup_stale_uploads()
+    queue_load = active_jobs()
 
     job_id = str(uuid.uuid4())
     JOBS[job_id] = {
@@ -74,6 +173,17 @@ def upload():
         "message": "Starting…",
         "output_path": None,
         "output_filename": None,
+        "estimate": None,
+        "cache": None,
+        "preview": preview,
+        "options": {
+            "skip_extraction": skip_extraction,
+            "output_stem": output_stem,
+        },
+        "upload_path": str(filepath),
+        "source_path": None,
+        "source_duration": audio_duration,
+        "finished_at": None,
     }
 
     def run():
@@ -83,13 +193,36 @@ def upload():
                 JOBS[job_id]["progress"] = pct
                 JOBS[job_id]["status"] = "running"
 
+            def on_info(info: dict):
+                if "cache_hits" in info:
+                    JOBS[job_id]["cache"] = dict(
+                        info, cache_time_saved_label=format_duration(info["cache_time_saved"])
+                    )
+                    return
+                JOBS[job_id]["estimate"] = dict(
+                    info, estimate_label=format_duration(info["estimate_seconds"])
+                )
+                if info.get("source_duration"):
+                    JOBS[job_id]["source_duration"] = info["source_duration"]
+
             out_path = run_pipeline(
                 filepath,
                 output_dir=app.config["OUTPUT_FOLDER"],
                 progress_callback=on_progress,
                 model_name=model_name,
                 shifts=shifts,
+                deadline=deadline,
+                queue_load=queue_load,
+                info_callback=on_info,
+                skip_extraction=skip_extraction,
+                preview=preview,
+                preview_start=preview_start,
+                audio_duration=audio_duration,
+                output_stem=output_stem,
+                segment_cache=segment_cache,
             )
+            if preview:
+                JOBS[job_id]["source_path"] = str(filepath)
             JOBS[job_id]["status"] = "done"
             JOBS[job_id]["progress"] = 100
             JOBS[job_id]["message"] = "Done"
@@ -100,16 +233,118 @@ def upload():
             JOBS[job_id]["message"] = str(e)
             JOBS[job_id]["progress"] = 0
         finally:
-            try:
-                filepath.unlink(missing_ok=True)
-            except OSError:
-                pass
+            JOBS[job_id]["finished_at"] = time.time()
+            if not JOBS[job_id]["source_path"]:
+                try:
+                    filepath.unlink(missing_ok=True)
+                except OSError:
+                    pass
 
     thread = threading.Thread(target=run, daemon=True)
     thread.start()
+    return job_id
+
+
+@app.route("/")
+def index():
+    return render_template(
+        "index.html",
+        models=DEMUCS_MODELS,
+        quality_profiles=QUALITY_PROFILES,
+        segment_cache_enabled=SEGMENT_CACHE_ENABLED,
+    )
+
+
+@app.route("/upload", methods=["POST"])
+def upload():
+    if "file" not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+    f = request.files["file"]
+    if f.filename == "":
+        return jsonify({"error": "No file selected"}), 400
+    if not allowed_file(f.filename):
+        return jsonify({"error": "File type not allowed. Use .mp4, .mov, etc."}), 400
+
+    filename = secure_filename(f.filename)
+    filepath = unique_upload_path(filename)
+    f.save(str(filepath))
+
+    model_name, shifts, deadline = parse_options(request.form)
+    preview, preview_start = parse_preview(request.form)
+    job_id = start_job(
+        filepath,
+        model_name=model_name,
+        shifts=shifts,
+        deadline=deadline,
+        preview=preview,
+        preview_start=preview_start,
+        output_stem=Path(filename).stem,
+        segment_cache=parse_segment_cache(request.form),
+    )
+    return jsonify({"job_id": job_id})
+
+
+@app.route("/upload-audio", methods=["POST"])
+def upload_audio():
+    """Accept audio already extracted in the browser (16-bit PCM WAV); skips FFmpeg."""
+    if "file" not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+    f = request.files["file"]
+    source_name = request.form.get("source_name", "") or f.filename or ""
+    stem = secure_filename(Path(source_name).stem)
+    if not stem:
+        return jsonify({"error": "No file selected"}), 400
+
+    filepath = unique_upload_path(f"{stem}.wav")
+    f.save(str(filepath))
+    if not is_pcm_wav(filepath):
+        filepath.unlink(missing_ok=True)
+        return jsonify({"error": "Audio must be a 16-bit PCM WAV file."}), 400
+
+    model_name, shifts, deadline = parse_options(request.form)
+    preview, preview_start = parse_preview(request.form)
+    job_id = start_job(
+        filepath,
+        model_name=model_name,
+        shifts=shifts,
+        deadline=deadline,
+        skip_extraction=True,
+        preview=preview,
+        preview_start=preview_start,
+        output_stem=stem,
+        segment_cache=parse_segment_cache(request.form),
+    )
     return jsonify({"job_id": job_id})
 
 
+@app.route("/promote/<job_id>", methods=["POST"])
+def promote(job_id):
+    """
+    Start the full job for a finished preview with the options now selected,
+    reusing the preview's upload and probe data.
+    """
+    if job_id not in JOBS:
+        return jsonify({"error": "Unknown job"}), 404
+    j = JOBS[job_id]
+    if not j["preview"] or j["status"] != "done":
+        return jsonify({"error": "Only finished previews can be promoted"}), 400
+    source = j.get("source_path")
+    if not source or not Path(source).exists():
+        return jsonify({"error": "Preview upload has expired; please upload again"}), 410
+    j["source_path"] = None
+    model_name, shifts, deadline = parse_options(request.form)
+    new_id = start_job(
+        Path(source),
+        model_name=model_name,
+        shifts=shifts,
+        deadline=deadline,
+        audio_duration=j.get("source_duration"),
+        segment_cache=parse_segment_cache(request.form),
+        **j["options"],
+    )
+    return jsonify({"job_id": new_id})
+
+
 @app.route("/progress/<job_id>")
 def progress(job_id):
     if job_id not in JOBS:
@@ -120,6 +355,35 @@ def progress(job_id):
         "progress": j["progress"],
         "message": j["message"],
         "output_filename": j.get("output_filename"),
+        "estimate": j.get("estimate"),
+        "cache": j.get("cache"),
+        "preview": j["preview"],
+    })
+
+
+@app.route("/estimate")
+def estimate():
+    try:
+        duration = float(request.args.get("duration", ""))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid duration"}), 400
+    if duration <= 0:
+        return jsonify({"error": "Invalid duration"}), 400
+    model_name, shifts, deadline = parse_options(request.args)
+    queue_load = active_jobs()
+    if shifts == AUTO_PROFILE:
+        model_name, shifts, seconds = choose_profile(
+            duration, deadline_seconds=deadline, queue_load=queue_load
+        )
+    else:
+        seconds = estimate_seconds(model_name, shifts, duration, queue_load=queue_load)
+    return jsonify({
+        "model_name": model_name,
+        "shifts": shifts,
+        "duration": duration,
+        "estimate_seconds": seconds,
+        "estimate_label": format_duration(seconds),
+        "queue_load": queue_load,
     })
 
 
@@ -137,7 +401,7 @@ def download(job_id):
 @app.route("/health")
 def health():
     ffmpeg_ok, ffmpeg_msg = check_ffmpeg_available()
-    return jsonify({"ffmpeg_ok": ffmpeg_ok, "ffmpeg_message": ffmpeg_msg})
+    return jsonify({"ffmpeg_ok": ffmpeg_ok, "ffmpeg_message": ffmpeg_msg, "warmup": warmup_status()})
 
 
 def main():
@@ -151,7 +415,10 @@ def main():
     def open_browser():
         webbrowser.open(url)
 
-    Timer(1.2, open_browser).start()
+    if os.environ.get("AUDIOSTEM_NO_BROWSER") != "1":
+        Timer(1.2, open_browser).start()
+    start_warmup()
+    start_upload_cleanup()
     print(f"AudioStem-Pro web UI: {url}")
     app.run(host=host, port=port, debug=False, use_reloader=False)
 